@@ -15,24 +15,36 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 
 """Adds bandcamp album search support to the autotagger."""
-from __future__ import absolute_import, division, print_function, unicode_literals
-
 import logging
 import re
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
 from html import unescape
 from itertools import chain
-from operator import attrgetter, truth
-from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Union
+from operator import attrgetter, methodcaller, truth
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Union,
+)
 
 import beets
 import beets.ui
 import beetsplug.fetchart as fetchart
 import requests
-import six
 from beets import plugins
 from beets.autotag.hooks import AlbumInfo, Distance, TrackInfo
 from beets.library import Item
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ._metaguru import DATA_SOURCE, DEFAULT_MEDIA, Metaguru, urlify
 
@@ -49,11 +61,17 @@ DEFAULT_CONFIG: JSONDict = {
 
 SEARCH_URL = "https://bandcamp.com/search?q={0}&page={1}"
 ALBUM_URL_IN_TRACK = re.compile(r'inAlbum":{[^}]*"@id":"([^"]*)"')
+LABEL_URL_IN_COMMENT = re.compile(r"https:[/a-z.-]+com")
 SEARCH_ITEM_PAT = 'href="(https://[^/]*/{}/[^?]*)'
 USER_AGENT = "beets/{} +http://beets.radbox.org/".format(beets.__version__)
 ALBUM_SEARCH = "album"
 ARTIST_SEARCH = "band"
 TRACK_SEARCH = "track"
+MAX_WORKERS = 5
+MAX_SEARCH_PAGES = 10
+REQUEST_TIMEOUT = 10
+MAX_RETRY_AFTER = 5
+PAGE_CACHE_SIZE = 32
 
 ADDITIONAL_DATA_MAP: Dict[str, str] = {
     "lyrics": "lyrics",
@@ -61,6 +79,52 @@ ADDITIONAL_DATA_MAP: Dict[str, str] = {
 }
 
 
+class CappedRetry(Retry):
+    """Retry which honours the Retry-After header but never waits longer than
+    MAX_RETRY_AFTER seconds, so that a single response cannot hold up the lookup.
+    """
+
+    def get_retry_after(self, response: Any) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER)
+
+
+def make_session() -> requests.Session:
+    """Return a session which keeps connections to bandcamp alive between requests
+    and retries the ones that fail with a temporary server error or get rate
+    limited, waiting as asked by the Retry-After header, up to a limit.
+    """
+    retry = CappedRetry(
+        total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)
+    )
+    adapter = HTTPAdapter(pool_maxsize=MAX_WORKERS * 2, max_retries=retry)
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = make_session()
+
+
+@lru_cache(maxsize=None)
+def search_item_pattern(search_type: str) -> Pattern:
+    """Return the compiled pattern for search results of the given type."""
+    return re.compile(SEARCH_ITEM_PAT.format(search_type))
+
+
+@lru_cache(maxsize=PAGE_CACHE_SIZE)
+def fetch_page(url: str) -> str:
+    """Return unescaped text of the url response, remembering recently fetched pages.
+    Failed requests raise and therefore never get cached. Bandcamp pages are always
+    UTF-8, so the encoding is set upfront and requests does not need to guess it.
+    """
+    response = SESSION.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    response.encoding = "utf-8"
+    return unescape(response.text)
+
+
 class BandcampRequestsHandler:
     """A class that provides an ability to make requests and handles failures."""
 
@@ -74,14 +138,11 @@ class BandcampRequestsHandler:
 
     def _get(self, url: str) -> str:
         """Return text contents of the url response."""
-        headers = {"User-Agent": USER_AGENT}
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
+            return fetch_page(url)
         except requests.exceptions.RequestException:
             self._info("Error while fetching URL: {}", url)
             return ""
-        return unescape(response.text)
 
 
 class BandcampAlbumArt(BandcampRequestsHandler, fetchart.RemoteArtSource):
@@ -94,12 +155,12 @@ class BandcampAlbumArt(BandcampRequestsHandler, fetchart.RemoteArtSource):
         # TODO: Make this configurable
         if hasattr(album, "art_source") and album.art_source == DATA_SOURCE:
             url = album.mb_albumid
-            if isinstance(url, six.string_types) and DATA_SOURCE in url:
+            if isinstance(url, str) and DATA_SOURCE in url:
                 html = self._get(url)
                 if html:
                     try:
                         yield self._candidate(
-                            url=self.guru(html).image,
+                            url=Metaguru(html).image,
                             match=fetchart.Candidate.MATCH_EXACT,
                         )
                     except (KeyError, AttributeError, ValueError):
@@ -116,6 +177,7 @@ class BandcampPlugin(BandcampRequestsHandler, plugins.BeetsPlugin):
     _gurucache: Dict[str, Metaguru]
 
     media: str
+    include_all: bool
     excluded_extra_fields: Set[str]
 
     def __init__(self) -> None:
@@ -126,6 +188,7 @@ class BandcampPlugin(BandcampRequestsHandler, plugins.BeetsPlugin):
             ADDITIONAL_DATA_MAP.pop("lyrics", None)
         # ~~~
         self.media = self.config["preferred_media"].as_str()
+        self.include_all = self.config["include_digital_only_tracks"].get(bool)
         self.excluded_extra_fields = set(self.config["exclude_extra_fields"].get())
         self.import_stages = [self.imported]
         self.register_listener("pluginload", self.loaded)
@@ -209,7 +272,7 @@ class BandcampPlugin(BandcampRequestsHandler, plugins.BeetsPlugin):
             return reimport_url
 
         if "Visit" in item.comments:
-            match = re.search(r"https:[/a-z.-]+com", item.comments)
+            match = LABEL_URL_IN_COMMENT.search(item.comments)
             if match:
                 url = match.group() + "/" + _type + "/" + urlify(name)
                 self._info("Trying our guess {} before searching", url)
@@ -226,7 +289,7 @@ class BandcampPlugin(BandcampRequestsHandler, plugins.BeetsPlugin):
             initial_guess = self.get_album_info(initial_url) if initial_url else None
             if initial_guess:
                 return iter([initial_guess])
-        return filter(truth, map(self.get_album_info, self._search(album, ALBUM_SEARCH)))
+        return self._fetch_all(self.get_album_info, self._search(album, ALBUM_SEARCH))
 
     def item_candidates(self, item, artist, title):
         # type: (Item, str, str) -> Iterator[TrackInfo]
@@ -240,7 +303,7 @@ class BandcampPlugin(BandcampRequestsHandler, plugins.BeetsPlugin):
         if initial_guess:
             return iter([initial_guess])
         query = title or item.album or artist
-        return filter(truth, map(self.get_track_info, self._search(query, TRACK_SEARCH)))
+        return self._fetch_all(self.get_track_info, self._search(query, TRACK_SEARCH))
 
     def album_for_id(self, album_id: str) -> Optional[AlbumInfo]:
         """Fetch an album by its bandcamp ID."""
@@ -256,20 +319,30 @@ class BandcampPlugin(BandcampRequestsHandler, plugins.BeetsPlugin):
         """
         html = self._get(url)
         if "/track/" in url:
-            match = re.search(ALBUM_URL_IN_TRACK, html)
+            match = ALBUM_URL_IN_TRACK.search(html)
             if match:
                 url = match.groups()[0]
                 html = self._get(url)
 
-        include_all = self.config["include_digital_only_tracks"]
         guru = self.guru(url, html=html)
-        return self.handle(partial(guru.album, include_all), url) if guru else None
+        return self.handle(partial(guru.album, self.include_all), url) if guru else None
 
     def get_track_info(self, url: str) -> Optional[TrackInfo]:
         """Returns a TrackInfo object for a bandcamp track page."""
         guru = self.guru(url)
         return self.handle(partial(attrgetter("singleton"), guru), url) if guru else None
 
+    @staticmethod
+    def _fetch_all(fetch: Callable[[str], Any], urls: Iterable[str]) -> Iterator[Any]:
+        """Call `fetch` for all urls concurrently and yield the successful results
+        as soon as they arrive, so that the autotagger can start working on the
+        first candidates while the rest are still downloading.
+        Fetching is I/O bound, so threads do the job.
+        """
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [executor.submit(fetch, url) for url in urls]
+            yield from filter(truth, map(methodcaller("result"), as_completed(futures)))
+
     def handle(self, call: Callable, _id: str) -> Any:
         try:
             return call()
@@ -280,31 +353,27 @@ class BandcampPlugin(BandcampRequestsHandler, plugins.BeetsPlugin):
     def _search(self, query: str, search_type: str = ALBUM_SEARCH) -> Iterator[str]:
         """Return an iterator for item URLs of type search_type matching the query."""
         max_urls = self.config["search_max"].as_number()
+        if max_urls <= 0:
+            return
         urls: Set[str] = set()
 
         page = 1
         html = "page=1"
-        pattern = SEARCH_ITEM_PAT.format(search_type)
-
-        def next_page_exists() -> bool:
-            return bool(re.search(rf"page={page}", html))
+        pattern = search_item_pattern(search_type)
 
         self._info("Searching {}s for {}", search_type, query)
-        while next_page_exists():
+        while page <= MAX_SEARCH_PAGES and f"page={page}" in html:
             self._info("Page {}", str(page))
             html = self._get(SEARCH_URL.format(query, page))
             if not html:
                 break
 
-            for match in re.finditer(pattern, html):
-                if len(urls) == max_urls:
-                    break
+            for match in pattern.finditer(html):
                 url = match.groups()[0]
                 if url not in urls:
                     urls.add(url)
                     yield url
-            else:
-                self._info("{} total URLs", str(len(urls)))
-                page += 1
-                continue
-            break
+                    if len(urls) >= max_urls:
+                        return
+            self._info("{} total URLs", str(len(urls)))
+            page += 1
@@ -1,17 +1,20 @@
 """Module for parsing bandcamp metadata."""
-import json
 import re
-from datetime import date, datetime
-from functools import reduce
+from datetime import date
+from functools import lru_cache, partial
+from json import JSONDecoder
 from math import floor
-from string import ascii_lowercase, digits
-from typing import Any, Dict, List, Optional, Pattern, Set, Union
+from typing import Any, Dict, List, Optional, Set, Union
 from unicodedata import normalize
 
 from beets.autotag.hooks import AlbumInfo, TrackInfo
 from cached_property import cached_property
 from pkg_resources import get_distribution, parse_version
-from pycountry import countries, subdivisions
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 NEW_BEETS = get_distribution("beets").parsed_version >= parse_version("1.5.0")
 
@@ -24,61 +27,70 @@ COUNTRY_OVERRIDES = {
     "The Netherlands": "NL",  # pycountry: Netherlands
     "UK": "GB",  # pycountry: Great Britain
 }
-DATE_FORMAT = "%d %B %Y"
 DATA_SOURCE = "bandcamp"
+JSON_LD_START = '<script type="application/ld+json">'
+JSON_LD_END = "</script>"
+JSON_DECODER = JSONDecoder()
+LYRICS_BLOCK = '"lyrics":{'
+LYRICS_TEXT = '"text":"'
 WORLDWIDE = "XW"
 DEFAULT_MEDIA = "Digital Media"
+MONTHS = {
+    "January": 1,
+    "February": 2,
+    "March": 3,
+    "April": 4,
+    "May": 5,
+    "June": 6,
+    "July": 7,
+    "August": 8,
+    "September": 9,
+    "October": 10,
+    "November": 11,
+    "December": 12,
+}
 MEDIA_MAP = {
     "VinylFormat": "Vinyl",
     "CDFormat": "CD",
     "CassetteFormat": "Cassette",
     "DigitalFormat": DEFAULT_MEDIA,
 }
-VALID_URL_CHARS = {*ascii_lowercase, *digits}
 
 _catalognum = r"([A-Z][^-.\s\d]+[-.\s]?\d{2,4}(?:[.-]?\d|CD)?)"
 _exclusive = r"\s?[\[(](bandcamp )?(digi(tal)? )?(bonus|only|exclusive)[\])]"
 _catalognum_header = r"(?:Catalogue(?: (?:Number|N[or])?)?|Cat N[or])\.?:"
-PATTERNS: Dict[str, Pattern] = {
-    "meta": re.compile(r".*datePublished.*", flags=re.MULTILINE),
-    "desc_catalognum": re.compile(rf"{_catalognum_header} ({_catalognum})"),
-    "quick_catalognum": re.compile(rf"\[{_catalognum}\]"),
-    "catalognum": re.compile(rf"^{_catalognum}|{_catalognum}$"),
-    "catalognum_excl": re.compile(r"(?i:vol(ume)?|artists)|202[01]|(^|\s)C\d\d|\d+/\d+"),
-    "digital": re.compile(rf"^DIGI (\d+\.\s?)?|(?i:{_exclusive})"),
-    "lyrics": re.compile(r'"lyrics":({[^}]*})'),
-    "release_date": re.compile(r"release[ds] ([\d]{2} [A-Z][a-z]+ [\d]{4})"),
-    "track_name": re.compile(
-        r"""
+META_PAT = re.compile(r".*datePublished.*", flags=re.MULTILINE)
+DESC_CATALOGNUM_PAT = re.compile(rf"{_catalognum_header} ({_catalognum})")
+QUICK_CATALOGNUM_PAT = re.compile(rf"\[{_catalognum}\]")
+CATALOGNUM_PAT = re.compile(rf"^{_catalognum}|{_catalognum}$")
+CATALOGNUM_EXCL_PAT = re.compile(r"(?i:vol(ume)?|artists)|202[01]|(^|\s)C\d\d|\d+/\d+")
+DIGITAL_PAT = re.compile(rf"^DIGI (\d+\.\s?)?|(?i:{_exclusive})")
+RELEASE_DATE_PAT = re.compile(r"release[ds] ([\d]{2} [A-Z][a-z]+ [\d]{4})")
+TRACK_NAME_PAT = re.compile(
+    r"""
 ((?P<track_alt>(^[ABCDEFGH]{1,3}\d|^\d)\d?)\s?[.-]+(?=[^\d]))?
 (\s?(?P<artist>[^-]*)(\s-\s))?
 (?P<title>(\b([^\s]-|-[^\s]|[^-])+$))""",
-        re.VERBOSE,
-    ),
-    "vinyl_name": re.compile(
-        r'(?P<count>[1-5]|[Ss]ingle|[Dd]ouble|[Tt]riple)(LP)? ?x? ?((7|10|12)" )?Vinyl'
-    ),
-}
+    re.VERBOSE,
+)
+VINYL_NAME_PAT = re.compile(
+    r'(?P<count>[1-5]|[Ss]ingle|[Dd]ouble|[Tt]riple)(LP)? ?x? ?((7|10|12)" )?Vinyl'
+)
+INVALID_URL_CHARS_PAT = re.compile(r"[^a-z0-9]+")
+FEATURING_PAT = re.compile(r" f(ea)?t\. .*")
 
 
 def urlify(pretty_string: str) -> str:
     """Make a string bandcamp-url-compatible."""
-    return reduce(
-        lambda p, n: p + n
-        if n in VALID_URL_CHARS
-        else p + "-"
-        if not p.endswith("-")
-        else p,
-        pretty_string.lower().replace("'", ""),
-        "",
-    ).strip("-")
+    name = pretty_string.lower().replace("'", "")
+    return INVALID_URL_CHARS_PAT.sub("-", name).strip("-")
 
 
 class Helpers:
     @staticmethod
     def get_vinyl_count(name: str) -> int:
         conv = {"single": 1, "double": 2, "triple": 3}
-        match = re.search(PATTERNS["vinyl_name"], name)
+        match = VINYL_NAME_PAT.search(name)
         if not match:
             return 1
         count: str = match.groupdict()["count"]
@@ -86,14 +98,23 @@ class Helpers:
 
     @staticmethod
     def check_digital_only(name: str) -> Dict[str, Union[bool, str]]:
-        no_digi_only_name = re.sub(PATTERNS["digital"], "", name)
+        no_digi_only_name = DIGITAL_PAT.sub("", name)
         if no_digi_only_name != name:
             return dict(digital_only=True, name=no_digi_only_name)
         return dict(digital_only=False)
 
     @staticmethod
     def parse_track_name(name: str) -> JSONDict:
-        match = re.search(PATTERNS["track_name"], name)
+        # fast path for plain 'Title' and 'Artist - Title' names which cannot have
+        # a track_alt prefix - the results are identical to the pattern's
+        if name[:1].isalpha() and name[0] not in "ABCDEFGH":
+            if "-" not in name:
+                return {"track_alt": None, "artist": None, "title": name}
+            artist, _, title = name.partition(" - ")
+            if name.count("-") == 1 and title[:1].isalnum():
+                return {"track_alt": None, "artist": artist, "title": title}
+
+        match = TRACK_NAME_PAT.search(name)
         try:
             return match.groupdict()  # type: ignore
         except AttributeError:
@@ -102,12 +123,12 @@ class Helpers:
     @staticmethod
     def parse_catalognum(album: str, disctitle: str, description: str) -> str:
         for pattern, string in [
-            (PATTERNS["desc_catalognum"], description),
-            (PATTERNS["quick_catalognum"], album),
-            (PATTERNS["catalognum"], disctitle),
-            (PATTERNS["catalognum"], album),
+            (DESC_CATALOGNUM_PAT, description),
+            (QUICK_CATALOGNUM_PAT, album),
+            (CATALOGNUM_PAT, disctitle),
+            (CATALOGNUM_PAT, album),
         ]:
-            match = re.search(pattern, re.sub(PATTERNS["catalognum_excl"], "", string))
+            match = pattern.search(CATALOGNUM_EXCL_PAT.sub("", string))
             if match:
                 try:
                     return next(group for group in match.groups() if group)
@@ -118,9 +139,47 @@ class Helpers:
 
     @staticmethod
     def parse_release_date(string: str) -> str:
-        match = re.search(PATTERNS["release_date"], string)
+        match = RELEASE_DATE_PAT.search(string)
         return match.groups()[0] if match else ""
 
+    @staticmethod
+    def parse_lyrics(html: str) -> List[str]:
+        """Return the text of every lyrics block found in the html.
+        Blocks are located with plain substring searches, and the JSON decoder
+        reads each text starting at its opening quote.
+        """
+        texts = []
+        start = html.find(LYRICS_BLOCK)
+        while start != -1:
+            end = html.find("}", start)
+            text_start = html.find(LYRICS_TEXT, start, len(html) if end < 0 else end)
+            if text_start == -1:
+                start = html.find(LYRICS_BLOCK, start + 1)
+                continue
+            text, start = JSON_DECODER.raw_decode(html, text_start + len(LYRICS_TEXT) - 1)
+            texts.append(text)
+            start = html.find(LYRICS_BLOCK, start)
+        return texts
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def parse_country(location: str) -> str:
+        """Return the country code for the given location, cached since the same
+        handful of locations keep coming up and the pycountry lookups are slow.
+        """
+        # pylint: disable=import-outside-toplevel
+        from pycountry import countries, subdivisions
+
+        name = normalize("NFKD", location).encode("ascii", "ignore").decode()
+        try:
+            return (
+                COUNTRY_OVERRIDES.get(name)
+                or getattr(countries.get(name=name, default=object), "alpha_2", None)
+                or subdivisions.lookup(name).country_code
+            )
+        except (ValueError, LookupError):
+            return WORLDWIDE
+
     @staticmethod
     def get_duration(source: JSONDict) -> int:
         for item in source.get("additionalProperty", []):
@@ -156,12 +215,13 @@ class Helpers:
             ]
         )
         pat = re.compile(pattern, flags=re.IGNORECASE)
-        return re.sub(pat, "", name).strip() or (args[0] if args else name)
+        return pat.sub("", name).strip() or (args[0] if args else name)
 
 
 class Metaguru(Helpers):
     html: str
     preferred_media: str
+    media: str
     meta: JSONDict
 
     _media: Dict[str, str]
@@ -172,11 +232,18 @@ class Metaguru(Helpers):
         self._media = {}
         self.html = html
         self.preferred_media = media
+        self.media = DEFAULT_MEDIA
 
         self.meta = {}
-        match = re.search(PATTERNS["meta"], html)
-        if match:
-            self.meta = json.loads(match.group())
+        start = html.find(JSON_LD_START)
+        if start >= 0:
+            start += len(JSON_LD_START)
+            end = html.find(JSON_LD_END, start)
+            self.meta = json_loads(html[start : end if end >= 0 else None])
+        else:  # bare JSON-LD data, like the url2json output
+            match = META_PAT.search(html)
+            if match:
+                self.meta = json_loads(match.group())
 
     @cached_property
     def album_name(self) -> str:
@@ -212,28 +279,21 @@ class Metaguru(Helpers):
 
     @property
     def lyrics(self) -> Optional[str]:
-        # TODO: Need to test
-        matches = re.findall(PATTERNS["lyrics"], self.html)
-        if not matches:
-            return None
-        return "\n".join(json.loads(m).get("text") for m in matches)
+        """Return newline-separated lyrics of all tracks, if any are found."""
+        texts = self.parse_lyrics(self.html)
+        return "\n".join(texts) if texts else None
 
     @cached_property
     def release_date(self) -> date:
-        datestr = self.parse_release_date(self.html)
-        return datetime.strptime(datestr, DATE_FORMAT).date()
-
-    @cached_property
-    def media(self) -> str:
-        """Return the human-readable version of the media format."""
-        return MEDIA_MAP.get(self._media.get("musicReleaseFormat", ""), DEFAULT_MEDIA)
+        day, month, year = self.parse_release_date(self.html).split()
+        return date(int(year), MONTHS[month], int(day))
 
     @cached_property
     def disctitle(self) -> str:
         """Digital media does not have discs unfortunately."""
         return "" if self.media == DEFAULT_MEDIA else self._media.get("name", "")
 
-    @property
+    @cached_property
     def mediums(self) -> int:
         return self.get_vinyl_count(self.disctitle) if self.media == "Vinyl" else 1
 
@@ -244,17 +304,12 @@ class Metaguru(Helpers):
     @cached_property
     def country(self) -> str:
         try:
-            loc = self.meta["publisher"]["foundingLocation"]["name"].rpartition(", ")[-1]
-            name = normalize("NFKD", loc).encode("ascii", "ignore").decode()
-            return (
-                COUNTRY_OVERRIDES.get(name)
-                or getattr(countries.get(name=name, default=object), "alpha_2", None)
-                or subdivisions.lookup(name).country_code
-            )
-        except (KeyError, ValueError, LookupError):
+            loc = self.meta["publisher"]["foundingLocation"]["name"]
+        except KeyError:
             return WORLDWIDE
+        return self.parse_country(loc.rpartition(", ")[-1])
 
-    @property
+    @cached_property
     def description(self) -> str:
         """Return album or media description of one of them exists and if it does not
         start with a generic message.
@@ -310,12 +365,12 @@ class Metaguru(Helpers):
 
     @cached_property
     def track_artists(self) -> Set[str]:
-        ignore = r" f(ea)?t\. .*"
-        artists = set(re.sub(ignore, "", t.get("artist") or "") for t in self.tracks)
+        remove_featuring = partial(FEATURING_PAT.sub, "")
+        artists = set(remove_featuring(t.get("artist") or "") for t in self.tracks)
         artists.discard("")
         return artists
 
-    @property
+    @cached_property
     def is_lp(self) -> bool:
         return "LP" in self.album_name or "LP" in self.disctitle
 
@@ -328,7 +383,7 @@ class Metaguru(Helpers):
     @cached_property
     def is_va(self) -> bool:
         return "various artists" in self.album_name.lower() or (
-            len(self.track_artists) > 1 and len(self.tracks) > 4
+            len(self.tracks) > 4 and len(self.track_artists) > 1
         )
 
     @cached_property
@@ -355,7 +410,7 @@ class Metaguru(Helpers):
             return "compilation"
         return "ep"
 
-    @property
+    @cached_property
     def _common(self) -> JSONDict:
         return dict(
             data_source=DATA_SOURCE,
@@ -407,7 +462,7 @@ class Metaguru(Helpers):
         return self._trackinfo(track, 1, **kwargs)
 
     def albuminfo(self, include_all: bool) -> AlbumInfo:
-        if self.media == "Digital Media" or include_all:
+        if self.media == DEFAULT_MEDIA or include_all:
             filtered_tracks = self.tracks
         else:
             filtered_tracks = [t for t in self.tracks if not t["digital_only"]]
@@ -443,9 +498,10 @@ class Metaguru(Helpers):
         # if preference is given and the format is available, return it
         for preference in self.preferred_media.split(","):
             if preference in medias:
-                self._media = medias[preference]
                 break
         else:  # otherwise, use the default option
-            self._media = medias[DEFAULT_MEDIA]
+            preference = DEFAULT_MEDIA
+        self._media = medias[preference]
+        self.media = preference
 
         return self.albuminfo(include_all)
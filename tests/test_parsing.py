@@ -1,5 +1,6 @@
 """Module for tests related to parsing."""
 import json
+from datetime import date
 
 import pytest
 
@@ -48,6 +49,20 @@ def test_description(meta, expected):
     assert guru.description == expected, vars(guru)
 
 
+@pytest.mark.parametrize(
+    ("html", "expected"),
+    [
+        ("", None),
+        ('"lyrics":{"@type":"CreativeWork","text":"Hello"}', "Hello"),
+        ('"lyrics":{"text":"Line \\"one\\"\\nLine {two}"}', 'Line "one"\nLine {two}'),
+        ('"lyrics":{"text":"Hi"},"lyrics":{"text":"H\\u00f8j"}', "Hi\nHøj"),
+        ('"lyrics":{"@type":"CreativeWork"},"lyrics":{"text":"Hey"}', "Hey"),
+    ],
+)
+def test_lyrics(html, expected):
+    assert Metaguru(html).lyrics == expected
+
+
 @pytest.mark.parametrize(
     ("name", "expected"),
     [
@@ -69,6 +84,7 @@ def test_mediums_count(name, expected):
         ("LI$INGLE010 - cyberflex - LEVEL X", "li-ingle010-cyberflex-level-x"),
         ("LI$INGLE007 - Re:drum - Movin'", "li-ingle007-re-drum-movin"),
         ("X23 & Høbie - Exhibit A", "x23-h-bie-exhibit-a"),
+        ("--Hello,  World!--", "hello-world"),
     ],
 )
 def test_convert_title(title, expected):
@@ -86,6 +102,11 @@ def test_parse_release_date(string, expected):
     assert Metaguru.parse_release_date(string) == expected
 
 
+def test_release_date():
+    guru = Metaguru("released 06 November 2019")
+    assert guru.release_date == date(2019, 11, 6)
+
+
 @pytest.mark.parametrize(
     ("name", "expected"),
     [
@@ -104,6 +125,7 @@ def test_parse_release_date(string, expected):
         ("24 Hours", (None, None, "24 Hours")),
         ("Some tune (Someone's Remix)", (None, None, "Some tune (Someone's Remix)")),
         ("19.85 - Colapso Inevitable", (None, "19.85", "Colapso Inevitable")),
+        ("Zed - Title (Remix)", (None, "Zed", "Title (Remix)")),
     ],
 )
 def test_parse_track_name(name, expected):
@@ -228,6 +250,17 @@ def test_parse_single_track_release(single_track_release):
     check(guru.singleton, expected.singleton)
 
 
+@pytest.mark.skipif(not NEW_BEETS, reason="singleton album fields need beets 1.5")
+def test_singleton_after_album(multitracks):
+    html, expected_release = multitracks
+    guru = Metaguru(html, expected_release.media)
+    guru.album(False)
+
+    singleton = guru.singleton
+    expected = Metaguru(html, expected_release.media).singleton
+    assert (singleton.album, singleton.albumtype) == (expected.album, expected.albumtype)
+
+
 def test_parse_album_or_comp(multitracks):
     html, expected_release = multitracks
     guru = Metaguru(html, expected_release.media)
@@ -0,0 +1,77 @@
+"""Module for tests related to paging through search results."""
+import pytest
+from beets import config
+
+from beetsplug.bandcamp import MAX_SEARCH_PAGES, SEARCH_URL, BandcampPlugin
+
+pytestmark = pytest.mark.parsing
+
+ALBUM = "https://label.bandcamp.com/album/{}"
+TRACK = "https://label.bandcamp.com/track/{}"
+
+
+def link(url: str) -> str:
+    return f'<a href="{url}?from=search">'
+
+
+@pytest.fixture
+def plugin(monkeypatch):
+    # keep config overrides made by the tests away from the global beets config
+    monkeypatch.setattr(config, "sources", list(config.sources))
+    pl = BandcampPlugin()
+    pl.config["search_max"] = 10
+    pages = {}
+    monkeypatch.setattr(pl, "_get", lambda url: pages.get(url, ""))
+    return pl, pages
+
+
+def test_search_continues_past_page_without_matches(plugin):
+    pl, pages = plugin
+    pages[SEARCH_URL.format("q", 1)] = link(TRACK.format("one")) + "page=2"
+    pages[SEARCH_URL.format("q", 2)] = link(ALBUM.format("two"))
+
+    assert list(pl._search("q", "album")) == [ALBUM.format("two")]
+
+
+def test_search_skips_urls_seen_on_previous_pages(plugin):
+    pl, pages = plugin
+    pages[SEARCH_URL.format("q", 1)] = link(ALBUM.format("one")) + "page=2"
+    pages[SEARCH_URL.format("q", 2)] = link(ALBUM.format("one")) + "page=3"
+    pages[SEARCH_URL.format("q", 3)] = link(ALBUM.format("three"))
+
+    expected = [ALBUM.format("one"), ALBUM.format("three")]
+    assert list(pl._search("q", "album")) == expected
+
+
+def test_search_stops_at_search_max(plugin):
+    pl, pages = plugin
+    pl.config["search_max"] = 2
+    albums = "".join(link(ALBUM.format(name)) for name in ("one", "two", "three"))
+    pages[SEARCH_URL.format("q", 1)] = albums + "page=2"
+
+    assert list(pl._search("q", "album")) == [ALBUM.format("one"), ALBUM.format("two")]
+
+
+def test_search_max_zero_finds_nothing(plugin):
+    pl, pages = plugin
+    pl.config["search_max"] = 0
+    pages[SEARCH_URL.format("q", 1)] = link(ALBUM.format("one"))
+
+    assert list(pl._search("q", "album")) == []
+
+
+def test_search_stops_after_max_pages(plugin, monkeypatch):
+    pl, pages = plugin
+    for page in range(1, MAX_SEARCH_PAGES + 2):
+        pages[SEARCH_URL.format("q", page)] = f"page={page + 1}"
+
+    requested = []
+    get = pl._get
+
+    def record(url):
+        requested.append(url)
+        return get(url)
+
+    monkeypatch.setattr(pl, "_get", record)
+    assert list(pl._search("q", "album")) == []
+    assert len(requested) == MAX_SEARCH_PAGES